@@ -0,0 +1,543 @@
+"""Compiled kernels for the hot loops in ``VicsekModel``.
+
+These are only used if Numba is installed. Otherwise ``NUMBA_AVAILABLE`` is False
+and the model falls back on its NumPy implementation.
+
+The kernels which loop over particles are written as plain functions and compiled
+by ``_compile``, once with those loops running in parallel and once without. The
+serial versions are for ``evolve_ensemble``, which runs in parallel over replicas
+instead, since Numba does not support nested parallelism.
+
+Compiled kernels are cached on disk, so that only the first process to use them
+pays for the compilation.
+"""
+
+import math
+import types
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for ``numba.njit`` which returns the function unchanged."""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+    prange = range
+else:
+    NUMBA_AVAILABLE = True
+
+
+@njit(cache=True)
+def _minimum_image(separation, length, inverse_length):
+    """Returns the shortest separation between two points on a periodic line.
+
+    Branchless, so that it does not prevent the enclosing loop from being
+    vectorised.
+    """
+    return separation - length * np.rint(separation * inverse_length)
+
+
+def neighbour_sums_all_pairs(
+    x,
+    y,
+    length,
+    radius_sq,
+    weighted_sines,
+    weighted_cosines,
+    sum_of_sines,
+    sum_of_cosines,
+):
+    """Sums the weighted sines and cosines of the headings of each particle's
+    neighbours, writing the results into ``sum_of_sines`` and ``sum_of_cosines``.
+
+    Particle ``j`` is a neighbour of particle ``i`` if the squared distance between
+    them, accounting for the periodic boundaries, is less than ``radius_sq[j]``.
+    """
+    n = x.size
+    inverse_length = 1 / length
+    for i in prange(n):
+        xi = x[i]
+        yi = y[i]
+        s = 0.0
+        c = 0.0
+        for j in range(n):
+            dx = _minimum_image(x[j] - xi, length, inverse_length)
+            dy = _minimum_image(y[j] - yi, length, inverse_length)
+            if dx * dx + dy * dy < radius_sq[j]:
+                s += weighted_sines[j]
+                c += weighted_cosines[j]
+        sum_of_sines[i] = s
+        sum_of_cosines[i] = c
+
+
+@njit(cache=True)
+def build_cell_list(x, y, length, cells, cell_start, order):
+    """Sorts the particles by the cell of a square grid which contains them, using a
+    counting sort.
+
+    On return, the particles in cell ``(cx, cy)`` are ``order[start:stop]``, where
+    ``start = cell_start[cx * cells + cy]`` and ``stop`` is the next element of
+    ``cell_start``. Hence the particles in neighbouring cells along ``y`` are also
+    next to each other in ``order``.
+    """
+    cell_start[:] = 0
+    for i in range(x.size):
+        cx = min(int(x[i] / length * cells), cells - 1)
+        cy = min(int(y[i] / length * cells), cells - 1)
+        cell_start[cx * cells + cy + 1] += 1
+    for c in range(cells * cells):
+        cell_start[c + 1] += cell_start[c]
+
+    position = cell_start[:-1].copy()
+    for i in range(x.size):
+        cx = min(int(x[i] / length * cells), cells - 1)
+        cy = min(int(y[i] / length * cells), cells - 1)
+        order[position[cx * cells + cy]] = i
+        position[cx * cells + cy] += 1
+
+
+@njit(fastmath=True, cache=True)
+def _sum_over_range(
+    start, stop, xi, yi, x, y, length, radius_sq, weighted_sines, weighted_cosines
+):
+    """Sums the weighted sines and cosines of the particles ``start:stop`` which are
+    neighbours of the point ``(xi, yi)``."""
+    inverse_length = 1 / length
+    s = 0.0
+    c = 0.0
+    for j in range(start, stop):
+        dx = _minimum_image(x[j] - xi, length, inverse_length)
+        dy = _minimum_image(y[j] - yi, length, inverse_length)
+        if dx * dx + dy * dy < radius_sq[j]:
+            s += weighted_sines[j]
+            c += weighted_cosines[j]
+    return s, c
+
+
+def step_cell_list(
+    length,
+    cells,
+    cell_start,
+    order,
+    gathered,
+    x,
+    y,
+    speed,
+    weights,
+    noise,
+    random,
+    sum_of_sines,
+    sum_of_cosines,
+    weighted_sines,
+    weighted_cosines,
+):
+    """Equivalent to ``neighbour_sums_all_pairs`` followed by ``advance``, but only
+    searches the cell containing each particle and the eight cells surrounding it.
+
+    The cell list must be built using ``build_cell_list``, with at least three cells
+    along each side, each of which is no smaller than the largest radius. The rows of
+    ``gathered`` are the x and y coordinates, squared radii and weighted sines and
+    cosines of the particles, in the order given by the cell list, so that the
+    particles in each cell are contiguous in memory.
+
+    Since the search only reads from this snapshot, each particle can be moved as
+    soon as the sums over its neighbours are known, in the same pass.
+    """
+    gathered_x = gathered[0]
+    gathered_y = gathered[1]
+    args = (gathered_x, gathered_y, length, gathered[2], gathered[3], gathered[4])
+    total_vx = 0.0
+    total_vy = 0.0
+    for cell in prange(cells * cells):
+        cx = cell // cells
+        cy = cell % cells
+        for i in range(cell_start[cell], cell_start[cell + 1]):
+            xi = gathered_x[i]
+            yi = gathered_y[i]
+            s = 0.0
+            c = 0.0
+            for ox in range(-1, 2):
+                row = ((cx + ox) % cells) * cells
+                if 0 < cy < cells - 1:
+                    # The three cells along y are contiguous
+                    start = cell_start[row + cy - 1]
+                    stop = cell_start[row + cy + 2]
+                    ds, dc = _sum_over_range(start, stop, xi, yi, *args)
+                    s += ds
+                    c += dc
+                else:
+                    for oy in range(-1, 2):
+                        neighbour = row + (cy + oy) % cells
+                        start = cell_start[neighbour]
+                        stop = cell_start[neighbour + 1]
+                        ds, dc = _sum_over_range(start, stop, xi, yi, *args)
+                        s += ds
+                        c += dc
+
+            j = order[i]
+            cosine, sine = _update_particle(
+                j,
+                s,
+                c,
+                x,
+                y,
+                length,
+                speed,
+                weights,
+                noise,
+                random,
+                sum_of_sines,
+                sum_of_cosines,
+                weighted_sines,
+                weighted_cosines,
+            )
+            total_vx += speed[j] * cosine
+            total_vy += speed[j] * sine
+
+    return total_vx, total_vy
+
+
+@njit(fastmath=True, cache=True)
+def _update_particle(
+    i,
+    s,
+    c,
+    x,
+    y,
+    length,
+    speed,
+    weights,
+    noise,
+    random,
+    sum_of_sines,
+    sum_of_cosines,
+    weighted_sines,
+    weighted_cosines,
+):
+    """Sets the new direction of particle ``i``, given the sums ``s`` and ``c`` of the
+    weighted sines and cosines of its neighbours, then moves it and wraps it around
+    the periodic boundaries.
+
+    Rather than converting the summed neighbour directions into a heading, adding
+    the noise and taking the sine and cosine of the result, the sums are rotated by
+    the noise and normalised. The resulting unit vector is written into
+    ``sum_of_sines`` and ``sum_of_cosines``, and stored, weighted, in
+    ``weighted_sines`` and ``weighted_cosines`` ready for the next step. Returns the
+    cosine and sine.
+    """
+    perturbation = (random[i] - 0.5) * noise[i]
+    rotate_cos = math.cos(perturbation)
+    rotate_sin = math.sin(perturbation)
+    cosine = rotate_cos * c - rotate_sin * s
+    sine = rotate_sin * c + rotate_cos * s
+
+    # If every neighbour has zero weight there is no preferred direction, which
+    # is treated as a heading of zero
+    norm = math.sqrt(cosine * cosine + sine * sine)
+    if norm > 0:
+        cosine /= norm
+        sine /= norm
+    else:
+        cosine = rotate_cos
+        sine = rotate_sin
+
+    # A particle that moves less than the length in one step can be wrapped around
+    # the boundaries with a single addition or subtraction, keeping the modulo for
+    # the rare case that it cannot. Rounding, including to single precision when
+    # the result is stored, means that the wrapped coordinates can reach the length
+    xi = x[i] + speed[i] * cosine
+    yi = y[i] + speed[i] * sine
+    if xi < 0:
+        xi += length
+    elif xi >= length:
+        xi -= length
+    if yi < 0:
+        yi += length
+    elif yi >= length:
+        yi -= length
+    if not (0 <= xi < length and 0 <= yi < length):
+        xi %= length
+        yi %= length
+    x[i] = xi
+    y[i] = yi
+    if x[i] >= length:
+        x[i] = 0.0
+    if y[i] >= length:
+        y[i] = 0.0
+
+    sum_of_sines[i] = sine
+    sum_of_cosines[i] = cosine
+    weighted_sines[i] = weights[i] * sine
+    weighted_cosines[i] = weights[i] * cosine
+    return cosine, sine
+
+
+def advance(
+    x,
+    y,
+    length,
+    speed,
+    weights,
+    noise,
+    sum_of_sines,
+    sum_of_cosines,
+    random,
+    weighted_sines,
+    weighted_cosines,
+):
+    """Applies ``_update_particle`` to every particle, using the sums of the weighted
+    sines and cosines of their neighbours in ``sum_of_sines`` and ``sum_of_cosines``.
+    Returns the components of the total velocity.
+    """
+    total_vx = 0.0
+    total_vy = 0.0
+    for i in prange(x.size):
+        cosine, sine = _update_particle(
+            i,
+            sum_of_sines[i],
+            sum_of_cosines[i],
+            x,
+            y,
+            length,
+            speed,
+            weights,
+            noise,
+            random,
+            sum_of_sines,
+            sum_of_cosines,
+            weighted_sines,
+            weighted_cosines,
+        )
+        total_vx += speed[i] * cosine
+        total_vy += speed[i] * sine
+
+    return total_vx, total_vy
+
+
+def _compile(func) -> tuple:
+    """Compiles ``func`` twice, returning a version in which ``prange`` loops run in
+    parallel and a version in which they run serially.
+
+    The serial version is compiled from a renamed copy of ``func``, so that the two
+    do not overwrite each other in the cache.
+    """
+    serial = types.FunctionType(
+        func.__code__, func.__globals__, func.__name__ + "_serial"
+    )
+    serial.__qualname__ = serial.__name__
+    return (
+        njit(parallel=True, fastmath=True, cache=True)(func),
+        njit(fastmath=True, cache=True)(serial),
+    )
+
+
+_all_pairs_parallel, _all_pairs_serial = _compile(neighbour_sums_all_pairs)
+_cell_list_parallel, _cell_list_serial = _compile(step_cell_list)
+_advance_parallel, _advance_serial = _compile(advance)
+
+
+@njit(cache=True)
+def step(
+    x,
+    y,
+    length,
+    speed,
+    radius_sq,
+    weights,
+    noise,
+    cells,
+    cell_start,
+    order,
+    gathered,
+    weighted_sines,
+    weighted_cosines,
+    sum_of_sines,
+    sum_of_cosines,
+    random,
+    parallel=True,
+):
+    """Performs a single step, returning the components of the total velocity.
+
+    Uses a cell list if there are at least three ``cells`` along each side of the
+    box. Otherwise, every pair of particles is checked and the particles are moved
+    in a second pass, since the search reads the positions directly.
+    """
+    if cells < 3:
+        search = (x, y, length, radius_sq, weighted_sines, weighted_cosines)
+        if parallel:
+            _all_pairs_parallel(*search, sum_of_sines, sum_of_cosines)
+        else:
+            _all_pairs_serial(*search, sum_of_sines, sum_of_cosines)
+
+        update = (
+            x,
+            y,
+            length,
+            speed,
+            weights,
+            noise,
+            sum_of_sines,
+            sum_of_cosines,
+            random,
+            weighted_sines,
+            weighted_cosines,
+        )
+        if parallel:
+            return _advance_parallel(*update)
+        else:
+            return _advance_serial(*update)
+
+    build_cell_list(x, y, length, cells, cell_start, order)
+    for i in range(order.size):
+        j = order[i]
+        gathered[0, i] = x[j]
+        gathered[1, i] = y[j]
+        gathered[2, i] = radius_sq[j]
+        gathered[3, i] = weighted_sines[j]
+        gathered[4, i] = weighted_cosines[j]
+
+    fused = (
+        length,
+        cells,
+        cell_start,
+        order,
+        gathered,
+        x,
+        y,
+        speed,
+        weights,
+        noise,
+        random,
+        sum_of_sines,
+        sum_of_cosines,
+        weighted_sines,
+        weighted_cosines,
+    )
+    if parallel:
+        return _cell_list_parallel(*fused)
+    else:
+        return _cell_list_serial(*fused)
+
+
+@njit(cache=True)
+def evolve(
+    x,
+    y,
+    headings,
+    length,
+    speed,
+    radius_sq,
+    weights,
+    noise,
+    cells,
+    cell_start,
+    order,
+    gathered,
+    weighted_sines,
+    weighted_cosines,
+    sum_of_sines,
+    sum_of_cosines,
+    random,
+    order_parameters,
+    parallel=True,
+):
+    """Evolves the system forwards ``random.shape[0]`` steps, in place.
+
+    ``random`` contains uniform random numbers in [0, 1) which generate the noise,
+    one row per step. If ``order_parameters`` is not empty, the order parameter
+    after each step is written into it. The loops over particles are only run in
+    parallel if ``parallel`` is True.
+    """
+    weighted_sines[:] = weights * np.sin(headings)
+    weighted_cosines[:] = weights * np.cos(headings)
+    total_speed = np.sum(speed)
+
+    for t in range(random.shape[0]):
+        total_vx, total_vy = step(
+            x,
+            y,
+            length,
+            speed,
+            radius_sq,
+            weights,
+            noise,
+            cells,
+            cell_start,
+            order,
+            gathered,
+            weighted_sines,
+            weighted_cosines,
+            sum_of_sines,
+            sum_of_cosines,
+            random[t],
+            parallel,
+        )
+        if order_parameters.size > 0:
+            order_parameters[t] = math.hypot(total_vx, total_vy) / total_speed
+
+    # Only the unit vectors are carried between steps, so convert the final ones
+    # back into headings
+    if random.shape[0] > 0:
+        headings[:] = np.arctan2(sum_of_sines, sum_of_cosines)
+
+
+@njit(parallel=True, cache=True)
+def evolve_ensemble(
+    x,
+    y,
+    headings,
+    length,
+    speed,
+    radius_sq,
+    weights,
+    noise,
+    cells,
+    cell_start,
+    order,
+    gathered,
+    weighted_sines,
+    weighted_cosines,
+    sum_of_sines,
+    sum_of_cosines,
+    random,
+    order_parameters,
+):
+    """Equivalent to ``evolve`` for a batch of independent replicas, which are run in
+    parallel.
+
+    Each argument has an extra leading dimension indexing the replicas, except for
+    ``length``, which is an array with one element per replica, and ``cells``, which
+    is shared by all of them.
+    """
+    for r in prange(x.shape[0]):
+        evolve(
+            x[r],
+            y[r],
+            headings[r],
+            length[r],
+            speed[r],
+            radius_sq[r],
+            weights[r],
+            noise[r],
+            cells,
+            cell_start[r],
+            order[r],
+            gathered[r],
+            weighted_sines[r],
+            weighted_cosines[r],
+            sum_of_sines[r],
+            sum_of_cosines[r],
+            random[r],
+            order_parameters[r],
+            parallel=False,
+        )
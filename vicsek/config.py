@@ -1,45 +1,142 @@
-import configargparse
-
-parser = configargparse.ArgParser()
-
-parser.add("-c", "--config", is_config_file=True, help="path to config file")
-parser.add("-o", "--outpath", type=str, default=".", help="path to output files")
-
-# Arguments specifying model parameters
-parser.add("-l", "--length", type=int, required=True, help="side length of box")
-parser.add(
-    "-d", "--density", type=float, required=True, help="density of particles in box"
-)
-parser.add(
-    "--speed",
-    type=float,
-    required=True,
-    nargs="*",
-    help="speed of particles",
-)
-parser.add(
-    "--noise",
-    type=float,
-    required=True,
-    nargs="*",
-    help="magnitude of noise",
-)
-parser.add(
-    "--radius",
-    type=float,
-    nargs="*",
-    default=1,
-    help="radius of interaction, default: 1",
-)
-parser.add(
-    "--weights",
-    type=float,
-    nargs="*",
-    default=1,
-    help="relative weights of particles in interaction, default: 1",
-)
-parser.add("--seed", type=int, default=None, help="provide integer seed for reproducibility")
-
-parser.add(
-    "--style", type=str, default=None, help="path to custom matplotlib style file"
-)
+from argparse import ArgumentTypeError
+from functools import lru_cache
+
+
+def _positive_int(value: str) -> int:
+    """Converts a command-line argument to an integer, rejecting values below one."""
+    try:
+        value = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid int value: {value!r}")
+    if value < 1:
+        raise ArgumentTypeError(f"expected a positive integer, got {value}")
+    return value
+
+
+@lru_cache(maxsize=None)
+def get_parser(command: str):
+    """Returns the argument parser for one of the command-line scripts.
+
+    The parser is only built (and ConfigArgParse imported) the first time it is
+    requested, rather than when this module is imported.
+
+    Parameters
+    ----------
+    command : str
+        Name of the script: one of 'vic-ani', 'vic-snap' or 'vic-ens'.
+
+    Returns
+    -------
+    configargparse.ArgParser
+    """
+    import configargparse
+
+    parser = configargparse.ArgParser(prog=command)
+
+    parser.add("-c", "--config", is_config_file=True, help="path to config file")
+    parser.add("-o", "--outpath", type=str, default=".", help="path to output files")
+
+    # Arguments specifying model parameters
+    parser.add("-l", "--length", type=int, required=True, help="side length of box")
+    parser.add(
+        "-d", "--density", type=float, required=True, help="density of particles in box"
+    )
+    parser.add(
+        "--speed",
+        type=float,
+        required=True,
+        nargs="*",
+        help="speed of particles",
+    )
+    parser.add(
+        "--noise",
+        type=float,
+        required=True,
+        nargs="*",
+        help="magnitude of noise",
+    )
+    parser.add(
+        "--radius",
+        type=float,
+        nargs="*",
+        default=1,
+        help="radius of interaction, default: 1",
+    )
+    parser.add(
+        "--weights",
+        type=float,
+        nargs="*",
+        default=1,
+        help="relative weights of particles in interaction, default: 1",
+    )
+    parser.add(
+        "--seed",
+        type=int,
+        default=None,
+        help="provide integer seed for reproducibility",
+    )
+
+    parser.add(
+        "--style", type=str, default=None, help="path to custom matplotlib style file"
+    )
+
+    # Arguments specific to each script
+    if command == "vic-ani":
+        parser.add(
+            "--frames", type=int, default=100, help="number of frames in the animation"
+        )
+        parser.add("--steps", type=int, default=1, help="number of steps per frame")
+        parser.add(
+            "--interval", type=int, default=30, help="number of ms between frames"
+        )
+    elif command == "vic-snap":
+        parser.add(
+            "--frames", type=int, default=100, help="number of snapshots to save"
+        )
+        parser.add(
+            "--steps", type=int, default=1, help="number of steps between snapshots"
+        )
+        parser.add(
+            "--mp4",
+            action="store_true",
+            help="pipe the snapshots to ffmpeg and save them as a video, instead of "
+            "saving separate images",
+        )
+        parser.add("--fps", type=int, default=30, help="frames per second of the video")
+        parser.add(
+            "--dpi",
+            type=int,
+            default=None,
+            help="resolution of the snapshots in dots per inch, default: that of the "
+            "figure",
+        )
+    elif command == "vic-ens":
+        parser.add(
+            "--ensemble-size",
+            type=int,
+            default=10,
+            help="number of replica systems to simulate",
+        )
+        parser.add(
+            "--steps",
+            type=int,
+            default=100,
+            help="number of steps to evolve for (before the first prompt, with "
+            "--interactive)",
+        )
+        parser.add(
+            "--interactive",
+            action="store_true",
+            help="show the plot and prompt for more steps, instead of just saving it",
+        )
+        parser.add(
+            "--checkpoint-every",
+            type=_positive_int,
+            default=None,
+            help="also save the plot every this many steps (ignored with "
+            "--interactive)",
+        )
+    else:
+        raise ValueError(f"Unknown command: {command}")
+
+    return parser
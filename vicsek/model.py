@@ -1,17 +1,57 @@
 from collections.abc import Iterable
 from functools import wraps
 import logging
+import math
 from typing import Union
 
 import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 import numpy as np
-from scipy.spatial.distance import pdist, squareform
+from scipy.spatial import cKDTree
+
+from vicsek import _kernels
 
 log = logging.getLogger(__name__)
 
 ParticleProperty = Union[float, Iterable[float]]
 
+# Without Numba, it is faster to check every pair than to build a tree for this many
+# particles or fewer
+DENSE_MAX_PARTICLES = 200
+
+# Number of elements in each block of the (particles, particles) adjacency matrix
+# when the neighbours are found without Numba or a tree
+DENSE_BLOCK_ELEMENTS = 2 ** 16
+
+# Extra distance, as a fraction of the largest radius, out to which pairs of particles
+# are listed by the k-d tree search, so that the list can be reused for several steps
+VERLET_SKIN = 0.5
+
+# Maximum number of random numbers to draw in advance when evolving several steps
+NOISE_CHUNK_SIZE = 2 ** 20
+
+
+def _as_pairs(array: np.ndarray) -> np.ndarray:
+    """Returns a view of a complex array as an array of shape (size, 2) containing
+    the real and imaginary parts."""
+    return array.view(array.real.dtype).reshape(-1, 2)
+
+
+def _wrap_periodic(positions: np.ndarray, length, max_step: float) -> None:
+    """Wraps positions back into the interval [0, length) in place.
+
+    Particles that have moved less than one length since they were last wrapped can
+    be brought back by adding or subtracting the length once, which is much cheaper
+    than np.mod. Rounding, in particular to single precision, means that the result
+    can reach the length, in which case it is set to zero.
+    """
+    if max_step < np.min(length):
+        np.add(positions, length, out=positions, where=positions < 0)
+        np.subtract(positions, length, out=positions, where=positions >= length)
+    else:
+        np.mod(positions, length, out=positions)
+    positions[positions >= length] = 0
+
 
 # TODO: probably silly to rely on explicit property 'particles'
 def expand_to_array(setter):
@@ -34,9 +74,12 @@ def expand_to_array(setter):
             raise ValueError(
                 "Too many values provided in setter: {setter}. Expected {instance.particles} but got {len(new)}"
             )
-        array = np.full(instance.particles, fill_value=new[-1], dtype=np.float64)
-        array[: len(new)] = new
-        array = np.flip(array)  # means 'special' ones are plotted above others
+        # Write in reverse order directly - means 'special' ones are plotted above
+        # others - rather than filling, then flipping into a second array
+        array = np.empty(instance.particles, dtype=np.float64)
+        split = instance.particles - len(new)
+        array[:split] = new[-1]
+        array[split:] = np.asarray(new, dtype=np.float64)[::-1]
         setter(instance, array)
 
     return wrapper
@@ -67,6 +110,10 @@ class VicsekModel:
     seed : int or None, optional
         Seed for random number generator. By providing a known integer one can
         reproduce the evolution of the model. None by default.
+    dtype : data-type, optional
+        Floating point type of the positions and headings of the particles. Single
+        precision halves the memory traffic of the neighbour searches, at the cost
+        of accuracy. ``np.float64`` by default.
 
     Notes
     -----
@@ -97,8 +144,10 @@ class VicsekModel:
         radius: ParticleProperty = 1,
         weights: ParticleProperty = 1,
         seed: Union[int, None] = None,
+        dtype: np.dtype = np.float64,
     ):
 
+        self._dtype = np.dtype(dtype)
         self.length = length
         self.density = density
         self.speed = speed
@@ -121,6 +170,7 @@ class VicsekModel:
     def length(self, new: int):
         """Setter for length. Also reinitialises state."""
         self._length = new
+        self._count_particles()
         if hasattr(self, "_reset_flag"):
             log.info("Resetting model to random initial configuration")
             self.init_state()
@@ -134,6 +184,7 @@ class VicsekModel:
     def density(self, new: float):
         """Setter for density. Also reinitialises state."""
         self._density = new
+        self._count_particles()
         if hasattr(self, "_reset_flag"):
             log.info("Resetting model to random initial configuration")
             self.init_state()
@@ -147,8 +198,10 @@ class VicsekModel:
     @speed.setter
     @expand_to_array
     def speed(self, new: ParticleProperty):
-        """Setter for speed."""
+        """Setter for speed. Also stores the largest magnitude of the speed, which
+        bounds how far any particle can move in one step."""
         self._speed = new
+        self._max_speed = np.abs(new).max()
 
     @property
     def radius(self) -> np.ndarray:
@@ -159,8 +212,13 @@ class VicsekModel:
     @radius.setter
     @expand_to_array
     def radius(self, new: ParticleProperty):
-        """Setter for radius."""
+        """Setter for radius. Also stores the squared radius, which is what the
+        neighbour searches compare against, whether it is the same for all particles,
+        in which case being neighbours is symmetric, and the largest radius."""
         self._radius = new
+        self._radius_sq = new ** 2
+        self._radius_uniform = bool(np.all(new == new[0]))
+        self._max_radius = new.max()
 
     @property
     def noise(self) -> np.ndarray:
@@ -194,8 +252,11 @@ class VicsekModel:
     @property
     def positions(self) -> np.ndarray:
         """Array of shape (particles, 2) containing the x and y coordinates of the
-        particles."""
-        return self._positions
+        particles.
+
+        This is a view of the underlying array of shape (2, particles), in which the
+        x and y coordinates are each stored contiguously."""
+        return self._positions.T
 
     @property
     def headings(self) -> np.ndarray:
@@ -206,21 +267,22 @@ class VicsekModel:
     def velocities(self) -> np.ndarray:
         """Array of shape (particles, 2) containing the x and y components of the
         velocities of the particles."""
-        return np.expand_dims(self.speed, 1) * np.stack(
-            (np.cos(self.headings), np.sin(self.headings)), axis=1
-        )
+        return np.expand_dims(self.speed, 1) * _as_pairs(np.exp(1j * self.headings))
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Floating point type of the positions and headings of the particles."""
+        return self._dtype
 
     @property
     def particles(self) -> int:
         """Number of particles in the simulation."""
-        return int(self._density * self.length ** 2)
+        return self._particles
 
     @property
     def order_parameter(self) -> float:
         """Magnitude of the combined velocity of all particles, normalised to [0, 1]."""
-        return (
-            np.sqrt(np.square(self.velocities.mean(axis=0)).sum()) / self.speed.mean()
-        )
+        return self._order_parameter(np.exp(1j * self._headings))
 
     @property
     def current_step(self) -> int:
@@ -230,10 +292,276 @@ class VicsekModel:
     @property
     def trajectory(self) -> dict:
         """A dictionary describing the trajectory of the order parameter (values) in
-        terms of the number of steps since initialisation (keys)."""
-        # NOTE: I removed the flexibility to measure OP every X steps, so the dict
-        # constructions is not necessary.
-        return self._trajectory
+        terms of the number of steps since initialisation (keys).
+
+        The trajectory is stored as arrays, so this constructs a new dictionary. Use
+        ``trajectory_arrays`` to get the arrays themselves."""
+        steps, values = self.trajectory_arrays
+        return dict(zip(steps.tolist(), values.tolist()))
+
+    @property
+    def trajectory_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """The trajectory of the order parameter, as an array of numbers of steps since
+        initialisation and an array of the corresponding values."""
+        if len(self._trajectory) > 1:
+            # Join the blocks so that they need not be joined again next time
+            self._trajectory = [
+                tuple(np.concatenate(arrays) for arrays in zip(*self._trajectory))
+            ]
+        return self._trajectory[0]
+
+    # --------------------------------------------------------------------------------
+    #                                                              | Private methods |
+    #                                                              -------------------
+
+    def _count_particles(self):
+        """Stores the number of particles, once both the length and the density have
+        been set, so that it is not recomputed every time it is needed."""
+        if hasattr(self, "_length") and hasattr(self, "_density"):
+            self._particles = int(self._density * self._length ** 2)
+
+    def _order_parameter(self, directions: np.ndarray) -> float:
+        """Returns the order parameter given the unit vectors, as complex numbers, in
+        the directions of the headings."""
+        # Components of the total velocity, without constructing the velocities
+        total_velocity = self.speed @ _as_pairs(directions)
+        return math.hypot(*total_velocity) / self.speed.sum()
+
+    def _neighbour_sums_numpy(
+        self, directions: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the weighted sums of the sines and cosines of the headings of the
+        particles within the interaction radius of each particle, given the unit
+        vectors, as complex numbers, in the directions of the headings."""
+        x, y = self._positions
+
+        # Weighted unit vectors as complex numbers. Viewed as real numbers these are
+        # (cosine, sine) pairs, so a single matrix product sums both over neighbours
+        unit_vectors = _as_pairs(self.weights * directions).astype(self.dtype)
+        sums = np.zeros((self.particles, 2), dtype=self.dtype)
+
+        # Work on blocks of rows so that the temporary arrays fit in cache, rather
+        # than being of size (particles, particles). Separations are symmetric, so
+        # each block is only compared with itself and the particles after it, and
+        # the contributions to those later particles are added at the same time
+        block_size = max(1, DENSE_BLOCK_ELEMENTS // self.particles)
+        for start in range(0, self.particles, block_size):
+            rows = slice(start, start + block_size)
+            later = slice(start + block_size, None)
+
+            # Separations along each axis, taking the shortest one allowed by the
+            # periodic boundaries
+            dx = np.abs(np.subtract.outer(x[rows], x[start:]))
+            dy = np.abs(np.subtract.outer(y[rows], y[start:]))
+            np.minimum(dx, self.length - dx, out=dx)
+            np.minimum(dy, self.length - dy, out=dy)
+            separation_sq = np.square(dx) + np.square(dy)
+
+            # Generate adjacency matrices - true if separation less than the radius of
+            # the neighbour, which is the particle in the column for the rows in this
+            # block, and the particle in the row for the later particles. Except in
+            # double precision, write them out as floats of the same type as the unit
+            # vectors, reusing dx and dy, so that the booleans are not upcast to
+            # double precision for the matrix products. If every particle has the
+            # same radius the two are the same
+            if self._radius_uniform:
+                adjacency_matrix = np.less(
+                    separation_sq,
+                    self._radius_sq[0],
+                    out=None if self.dtype == np.float64 else dx,
+                    casting="unsafe",
+                )
+                transposed = adjacency_matrix[:, block_size:]
+            elif self.dtype == np.float64:
+                adjacency_matrix = separation_sq < self._radius_sq[start:]
+                transposed = separation_sq[:, block_size:] < self._radius_sq[rows, None]
+            else:
+                adjacency_matrix = np.less(
+                    separation_sq, self._radius_sq[start:], out=dx, casting="unsafe"
+                )
+                transposed = np.less(
+                    separation_sq[:, block_size:],
+                    self._radius_sq[rows, None],
+                    out=dy[:, block_size:],
+                    casting="unsafe",
+                )
+
+            # Multiplying by the transpose of a matrix is much slower, so the second
+            # product is taken the other way around and the result transposed instead
+            sums[rows] += adjacency_matrix @ unit_vectors[start:]
+            sums[later] += (unit_vectors[rows].T @ transposed).T
+
+        return sums[:, 1], sums[:, 0]
+
+    def _neighbour_sums_tree(
+        self, directions: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Equivalent to ``_neighbour_sums_numpy`` but uses a k-d tree, which handles
+        the periodic boundaries itself, to find the neighbours of each particle. Avoids
+        constructing any (particles, particles) arrays."""
+        first, second = self._candidate_pairs()
+
+        # The candidates are further apart than the largest radius, so check whether
+        # each particle in a pair is within the radius of the other, separately
+        x, y = self._positions
+        dx = np.abs(x[second] - x[first])
+        dy = np.abs(y[second] - y[first])
+        np.minimum(dx, self.length - dx, out=dx)
+        np.minimum(dy, self.length - dy, out=dy)
+        separation_sq = np.square(dx) + np.square(dy)
+        second_to_first = separation_sq < self._radius_sq[second]
+        first_to_second = separation_sq < self._radius_sq[first]
+
+        # Pairs of indices (i, j), where j is a neighbour of i. Every particle with a
+        # nonzero radius is also its own neighbour
+        itself = np.flatnonzero(self._radius_sq > 0)
+        i = np.concatenate((first[second_to_first], second[first_to_second], itself))
+        j = np.concatenate((second[second_to_first], first[first_to_second], itself))
+
+        unit_vectors = (self.weights * directions)[j]
+        return (
+            np.bincount(i, weights=unit_vectors.imag, minlength=self.particles),
+            np.bincount(i, weights=unit_vectors.real, minlength=self.particles),
+        )
+
+    def _candidate_pairs(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the indices of pairs of particles which might be within the largest
+        radius of each other, each pair listed once.
+
+        The pairs are found using a k-d tree, with a cutoff a fraction ``VERLET_SKIN``
+        larger than the largest radius, unless the particles are fast enough to cross
+        that skin within two steps. They are reused in later steps (a Verlet list)
+        until a particle might have moved far enough to enter the radius of another
+        particle which is not in the list, i.e. twice the largest displacement since
+        the list was built exceeds the difference between the cutoff and the radius.
+        """
+        max_radius = self._max_radius
+        if self._verlet_pairs is not None:
+            dx, dy = np.abs(self._positions - self._verlet_positions)
+            np.minimum(dx, self.length - dx, out=dx)
+            np.minimum(dy, self.length - dy, out=dy)
+            max_displacement = math.sqrt((np.square(dx) + np.square(dy)).max())
+            if max_radius + 2 * max_displacement <= self._verlet_cutoff:
+                return self._verlet_pairs
+
+        # Particles move by their speed every step, so there is no point in a skin
+        # which would not last for at least two steps
+        skin = VERLET_SKIN * max_radius
+        if 4 * self._max_speed > skin:
+            skin = 0
+
+        self._verlet_cutoff = max_radius + skin
+        self._verlet_positions = self._positions.copy()
+        tree = cKDTree(self.positions, boxsize=self.length)
+        self._verlet_pairs = tuple(
+            tree.query_pairs(self._verlet_cutoff, output_type="ndarray").T
+        )
+        return self._verlet_pairs
+
+    def _cells_per_side(self) -> int:
+        """Number of cells along each side of the box for a cell list search.
+
+        Cells must be no smaller than the largest radius. There is no point having
+        many more cells than particles though. If this is less than three, a cell list
+        is no better than checking every pair of particles.
+        """
+        max_radius = self._max_radius
+        cells = int(np.sqrt(self.particles)) + 1
+        if max_radius > 0:
+            cells = min(cells, int(self.length // max_radius))
+        return cells
+
+    def _evolve_numba(self, steps: int, track_order_parameter: bool = False):
+        """Compiled equivalent of ``evolve``, which runs many steps for each call from
+        Python. The random numbers for the noise are drawn in chunks beforehand.
+
+        Uses a cell list so that only nearby particles are searched, unless the
+        interaction radius is too large for the box to be split into at least three
+        cells along each side, in which case every pair of particles is checked.
+        """
+        cells = self._cells_per_side()
+        if self._cell_start.size != cells ** 2 + 1:
+            self._cell_start = np.empty(cells ** 2 + 1, dtype=np.int64)
+
+        x, y = self._positions
+        args = (
+            x,
+            y,
+            self._headings,
+            self.length,
+            self.speed,
+            self._radius_sq,
+            self.weights,
+            self.noise,
+            cells,
+            self._cell_start,
+            self._cell_order,
+            self._gathered,
+            self._weighted_sines,
+            self._weighted_cosines,
+            self._sum_of_sines,
+            self._sum_of_cosines,
+        )
+
+        # Limit the memory taken up by the random numbers
+        chunk = max(1, NOISE_CHUNK_SIZE // self.particles)
+        for start in range(0, steps, chunk):
+            random = self._rng.random(
+                (min(chunk, steps - start), self.particles), dtype=self.dtype
+            )
+            order_parameters = np.empty(len(random) if track_order_parameter else 0)
+
+            _kernels.evolve(*args, random, order_parameters)
+
+            self._current_step += len(random)
+            self._record_trajectory(order_parameters)
+
+    def _record_trajectory(self, order_parameters: np.ndarray):
+        """Appends the order parameter after each of the most recent steps, in order,
+        to the trajectory."""
+        if order_parameters.size > 0:
+            steps = np.arange(
+                self._current_step - order_parameters.size + 1, self._current_step + 1
+            )
+            self._trajectory.append((steps, order_parameters))
+
+    def _step_numpy(self, directions: np.ndarray, random: np.ndarray) -> np.ndarray:
+        """Performs a single step without Numba, given the unit vectors, as complex
+        numbers, in the directions of the current headings, and one uniform random
+        number per particle for the noise, which is overwritten. Returns the unit
+        vectors for the new headings, so that a sequence of steps only needs to
+        compute them once per step.
+        """
+        # Average over current headings of particles within radius. A tree search is
+        # pointless if the radius is comparable to the size of the box
+        if self.particles > DENSE_MAX_PARTICLES and self._cells_per_side() >= 3:
+            sum_of_sines, sum_of_cosines = self._neighbour_sums_tree(directions)
+        else:
+            sum_of_sines, sum_of_cosines = self._neighbour_sums_numpy(directions)
+
+        # Set new headings
+        np.arctan2(sum_of_sines, sum_of_cosines, out=self._headings)  # interactions
+        noise = random
+        noise -= 0.5
+        noise *= self.noise
+        self._headings += noise
+
+        # Step forward particles, reusing the same buffers on every step. The unit
+        # vectors passed in are no longer needed, so they may be overwritten
+        directions = np.multiply(self._headings, 1j, out=self._directions)
+        np.exp(directions, out=directions)
+        displacements = np.multiply(
+            self.speed, _as_pairs(directions).T, out=self._displacements
+        )
+        self._positions += displacements
+
+        # Check for wrapping around the periodic boundaries
+        _wrap_periodic(self._positions, self.length, self._max_speed)
+
+        # Update step counter
+        self._current_step += 1
+
+        return directions
 
     # --------------------------------------------------------------------------------
     #                                                               | Public methods |
@@ -250,46 +578,47 @@ class VicsekModel:
         """
         self._rng = np.random.default_rng(seed)
 
-        self._positions = self._rng.random((self.particles, 2)) * self.length
-        self._headings = self._rng.random(size=self.particles) * 2 * np.pi
+        positions = self._rng.random((2, self.particles)) * self.length
+        headings = self._rng.random(size=self.particles) * 2 * np.pi
+        self._positions = positions.astype(self.dtype)
+        # Casting to single precision can round a coordinate up to the length
+        self._positions[self._positions >= self.length] = 0
+        self._headings = headings.astype(self.dtype)
+
+        # Scratch space reused by every step
+        self._weighted_sines = np.empty(self.particles, dtype=self.dtype)
+        self._weighted_cosines = np.empty(self.particles, dtype=self.dtype)
+        self._sum_of_sines = np.empty(self.particles, dtype=self.dtype)
+        self._sum_of_cosines = np.empty(self.particles, dtype=self.dtype)
+        self._noise_buffer = np.empty(self.particles, dtype=self.dtype)
+        self._directions = np.empty(
+            self.particles, dtype=np.result_type(self.dtype, 1j)
+        )
+        self._displacements = np.empty((2, self.particles), dtype=self.dtype)
+        self._cell_start = np.empty(0, dtype=np.int64)
+        self._cell_order = np.empty(self.particles, dtype=np.int64)
+        self._gathered = np.empty((5, self.particles), dtype=self.dtype)
+        self._verlet_pairs = None
 
         self._current_step = 0
-        self._trajectory = {0: self.order_parameter}
+        # Blocks of (steps, order parameters) arrays, in the order they were recorded
+        self._trajectory = [
+            (np.zeros(1, dtype=np.int64), np.array([self.order_parameter]))
+        ]
 
         self._reset_flag = True
 
     def step(self):
         """Performs a single step for all particles."""
-        # Generate adjacency matrix - true if separation less than radius
-        distance_matrix = squareform(pdist(self.positions))
-        adjacency_matrix = distance_matrix < self.radius
-
-        # Average over current headings of particles within radius
-        headings_matrix = np.ma.array(
-            np.broadcast_to(self.headings, (self.particles, self.particles)),
-            mask=~adjacency_matrix,
-        )
-        sum_of_sines = (self.weights * np.sin(headings_matrix)).sum(axis=1)
-        sum_of_cosines = (self.weights * np.cos(headings_matrix)).sum(axis=1)
+        if _kernels.NUMBA_AVAILABLE:
+            self._evolve_numba(steps=1)
+            return
 
-        # Set new headings
-        self._headings = (
-            np.arctan2(sum_of_sines, sum_of_cosines)  # interactions
-            + (self._rng.random(self.particles) - 0.5) * self.noise  # noise
+        self._step_numpy(
+            np.exp(1j * self._headings),
+            self._rng.random(out=self._noise_buffer, dtype=self.dtype),
         )
 
-        # Step forward particles
-        self._positions += np.expand_dims(self.speed, 1) * np.stack(
-            (np.cos(self.headings), np.sin(self.headings)),
-            axis=1,
-        )
-
-        # Check for wrapping around the periodic boundaries
-        np.mod(self._positions, self.length, out=self._positions)
-
-        # Update step counter
-        self._current_step += 1
-
     def evolve(
         self,
         steps: int,
@@ -305,10 +634,25 @@ class VicsekModel:
             If True, update the trajectory of the order parameter during evolution.
             False by default.
         """
-        for _ in range(steps):
-            self.step()
-            if track_order_parameter:
-                self._trajectory[self.current_step] = self.order_parameter
+        if _kernels.NUMBA_AVAILABLE:
+            self._evolve_numba(steps, track_order_parameter)
+            return
+
+        order_parameters = np.empty(steps if track_order_parameter else 0)
+        directions = np.exp(1j * self._headings)
+
+        # Draw the random numbers in chunks rather than one step at a time
+        chunk = max(1, NOISE_CHUNK_SIZE // self.particles)
+        for start in range(0, steps, chunk):
+            random = self._rng.random(
+                (min(chunk, steps - start), self.particles), dtype=self.dtype
+            )
+            for t, row in enumerate(random, start=start):
+                directions = self._step_numpy(directions, row)
+                if track_order_parameter:
+                    order_parameters[t] = self._order_parameter(directions)
+
+        self._record_trajectory(order_parameters)
 
     def get_box(self) -> Rectangle:
         """Returns a Rectangle patch representing the box."""
@@ -345,12 +689,10 @@ class VicsekModel:
         box = self.get_box()
         ax.add_patch(box)
 
-        ax.quiver(
-            self.positions[:, 0],
-            self.positions[:, 1],
-            self.velocities[:, 0],
-            self.velocities[:, 1],
-        )
+        # The velocities are constructed on each access, so only do it once
+        x, y = self._positions
+        u, v = self.velocities.T
+        ax.quiver(x, y, u, v)
         if annotate:
             ax.annotate(
                 f"OP = {self.order_parameter:1.2f}",
@@ -365,3 +707,183 @@ class VicsekModel:
                 fontsize=12,
             )
         return fig
+
+
+def _evolve_ensemble_numba(
+    ensemble: list[VicsekModel],
+    steps: int,
+    track_order_parameter: bool,
+    positions: np.ndarray,
+    headings: np.ndarray,
+):
+    """Evolves stacked replicas using a compiled kernel which runs in parallel over
+    the replicas. The replicas must have the same number of particles and cells."""
+    n_replicas, particles = headings.shape
+    cells = ensemble[0]._cells_per_side()
+    args = (
+        *positions,
+        headings,
+        np.array([replica.length for replica in ensemble], dtype=np.float64),
+        np.stack([replica.speed for replica in ensemble]),
+        np.stack([replica._radius_sq for replica in ensemble]),
+        np.stack([replica.weights for replica in ensemble]),
+        np.stack([replica.noise for replica in ensemble]),
+        cells,
+        np.empty((n_replicas, cells ** 2 + 1), dtype=np.int64),
+        np.empty((n_replicas, particles), dtype=np.int64),
+        np.empty((n_replicas, 5, particles), dtype=positions.dtype),
+        *np.empty((4, n_replicas, particles), dtype=positions.dtype),
+    )
+
+    # Limit the memory taken up by the random numbers
+    chunk = max(1, NOISE_CHUNK_SIZE // (n_replicas * particles))
+    for start in range(0, steps, chunk):
+        size = min(chunk, steps - start)
+        random = np.stack(
+            [
+                replica._rng.random((size, particles), dtype=replica.dtype)
+                for replica in ensemble
+            ]
+        )
+        order_parameters = np.empty((n_replicas, size if track_order_parameter else 0))
+
+        _kernels.evolve_ensemble(*args, random, order_parameters)
+
+        for replica, trajectory in zip(ensemble, order_parameters):
+            replica._current_step += size
+            replica._record_trajectory(trajectory)
+
+
+def _evolve_ensemble_numpy(
+    ensemble: list[VicsekModel],
+    steps: int,
+    track_order_parameter: bool,
+    positions: np.ndarray,
+    headings: np.ndarray,
+):
+    """Evolves stacked replicas using the dense neighbour search, applied to blocks of
+    replicas at once. The replicas must have the same number of particles.
+
+    Blocks hold as many full adjacency matrices as fit in ``DENSE_BLOCK_ELEMENTS``,
+    but at least one, so this is only suitable for small replicas."""
+    n_replicas, particles = headings.shape
+    x, y = positions
+
+    # Add axes so that these broadcast against blocks of (particles, particles) arrays
+    length = np.array([replica.length for replica in ensemble]).reshape(-1, 1, 1)
+    radius_sq = np.stack([replica._radius_sq for replica in ensemble])[:, None, :]
+
+    speed = np.stack([replica.speed for replica in ensemble])
+    weights = np.stack([replica.weights for replica in ensemble])
+    noise = np.stack([replica.noise for replica in ensemble])
+    total_speed = speed.sum(axis=1)
+    max_speed = np.abs(speed).max()
+
+    directions = np.exp(1j * headings)
+    sums = np.empty((n_replicas, particles, 2))
+    block_size = max(1, DENSE_BLOCK_ELEMENTS // particles ** 2)
+    order_parameters = np.empty((n_replicas, steps if track_order_parameter else 0))
+
+    # Limit the memory taken up by the random numbers
+    chunk = max(1, NOISE_CHUNK_SIZE // (n_replicas * particles))
+
+    for t in range(steps):
+        # Each replica draws its noise from its own generator, as it would alone
+        if t % chunk == 0:
+            random = np.stack(
+                [
+                    replica._rng.random(
+                        (min(chunk, steps - t), particles), dtype=replica.dtype
+                    )
+                    for replica in ensemble
+                ]
+            )
+
+        # Weighted unit vectors viewed as (cosine, sine) pairs, as in a single model
+        unit_vectors = _as_pairs(weights * directions).reshape(n_replicas, -1, 2)
+
+        for start in range(0, n_replicas, block_size):
+            block = slice(start, start + block_size)
+
+            dx = np.abs(x[block, :, None] - x[block, None, :])
+            dy = np.abs(y[block, :, None] - y[block, None, :])
+            np.minimum(dx, length[block] - dx, out=dx)
+            np.minimum(dy, length[block] - dy, out=dy)
+
+            adjacency_matrix = (np.square(dx) + np.square(dy)) < radius_sq[block]
+
+            sums[block] = adjacency_matrix @ unit_vectors[block]
+
+        np.arctan2(sums[..., 1], sums[..., 0], out=headings)
+        perturbation = random[:, t % chunk]
+        perturbation -= 0.5
+        perturbation *= noise
+        headings += perturbation
+
+        directions = np.exp(1j * headings)
+        velocities = speed * directions
+        x += velocities.real
+        y += velocities.imag
+
+        _wrap_periodic(positions, length.reshape(1, -1, 1), max_speed)
+
+        if track_order_parameter:
+            order_parameters[:, t] = np.abs(velocities.sum(axis=1)) / total_speed
+
+    for replica, trajectory in zip(ensemble, order_parameters):
+        replica._current_step += steps
+        replica._record_trajectory(trajectory)
+
+
+def evolve_ensemble(
+    ensemble: list[VicsekModel],
+    steps: int,
+    track_order_parameter: bool = False,
+):
+    """Evolves an ensemble of independent models forwards a number of steps.
+
+    If the replicas all have the same number of particles, they are stacked and
+    evolved together. With Numba, a single compiled kernel runs in parallel over the
+    replicas, provided they also have the same number of cells. Without Numba,
+    replicas with at most ``DENSE_MAX_PARTICLES`` particles are stepped in blocks.
+    Otherwise, this is equivalent to calling ``evolve`` for each replica in turn.
+    Either way, each replica draws its noise from its own random number generator,
+    so the results do not depend on the path taken.
+
+    Parameters
+    ----------
+    ensemble : list[VicsekModel]
+        The replicas to evolve.
+    steps : int
+        Number of updates.
+    track_order_parameter : bool, optional
+        If True, update the trajectory of the order parameter of each replica during
+        evolution. False by default.
+    """
+    particles = {replica.particles for replica in ensemble}
+    cells = {replica._cells_per_side() for replica in ensemble}
+    if _kernels.NUMBA_AVAILABLE:
+        batched = len(cells) == 1
+        evolve_batch = _evolve_ensemble_numba
+    else:
+        # Larger replicas are left to evolve(), which splits their adjacency
+        # matrices into blocks of rows, even where they would use the dense search
+        batched = all(replica.particles <= DENSE_MAX_PARTICLES for replica in ensemble)
+        evolve_batch = _evolve_ensemble_numpy
+
+    if len(particles) != 1 or not batched:
+        for replica in ensemble:
+            replica.evolve(steps, track_order_parameter)
+        return
+
+    # Stack the state, with one row for each replica
+    positions = np.stack([replica._positions for replica in ensemble], axis=1)
+    headings = np.stack([replica._headings for replica in ensemble])
+
+    evolve_batch(ensemble, steps, track_order_parameter, positions, headings)
+
+    for replica, replica_positions, replica_headings in zip(
+        ensemble, positions.swapaxes(0, 1), headings
+    ):
+        replica._positions[...] = replica_positions
+        replica._headings[...] = replica_headings
@@ -3,24 +3,20 @@ from pathlib import Path
 
 import matplotlib.pyplot as plt
 
-from vicsek.config import parser
+from vicsek.config import get_parser
 from vicsek.model import VicsekModel
 from vicsek.style import default_animation_style
 from vicsek.visualize import ParticlesAnimation
 
 log = logging.getLogger(__name__)
 
-parser.add("--frames", type=int, default=100, help="number of frames in the animation")
-parser.add("--steps", type=int, default=1, help="number of steps per frame")
-parser.add("--interval", type=int, default=30, help="number of ms between frames")
-
 plt.style.use(default_animation_style)
 
 FNAME = "animation.gif"
 
 
 def main():
-    args = parser.parse_args()
+    args = get_parser("vic-ani").parse_args()
 
     outpath = Path(args.outpath)
     if Path(outpath / FNAME).is_file():
@@ -1,26 +1,21 @@
 import logging
 from pathlib import Path
 
+import matplotlib
 import matplotlib.pyplot as plt
-from tqdm.autonotebook import tqdm
+from matplotlib.collections import LineCollection
+import numpy as np
 
-from vicsek.config import parser
-from vicsek.model import VicsekModel
+from vicsek.config import get_parser
+from vicsek.model import VicsekModel, evolve_ensemble
 
 log = logging.getLogger(__name__)
 
-parser.add(
-    "--ensemble-size",
-    type=int,
-    default=10,
-    help="number of replica systems to simulate",
-)
-
 FNAME = "ensemble.png"
 
 
 def main():
-    args = parser.parse_args()
+    args = get_parser("vic-ens").parse_args()
 
     outpath = Path(args.outpath)
     if Path(outpath / FNAME).is_file():
@@ -30,9 +25,14 @@ def main():
     if not Path(outpath).is_dir():
         outpath.mkdir(parents=True)
 
+    # The plot is only shown on screen when running interactively
+    if not args.interactive:
+        matplotlib.use("Agg")
+
     if args.style is not None:
         plt.style.use(args.style)
 
+    # Each replica needs its own seed, otherwise they would all be identical
     ensemble = [
         VicsekModel(
             length=args.length,
@@ -41,30 +41,45 @@ def main():
             noise=args.noise,
             radius=args.radius,
             weights=args.weights,
-            seed=args.seed,
+            seed=None if args.seed is None else args.seed + i,
         )
-        for _ in range(args.ensemble_size)
+        for i in range(args.ensemble_size)
     ]
 
-    steps = 100
+    # Without a prompt, run to --steps in chunks so the plot can be checkpointed
+    steps = args.steps
+    if not args.interactive and args.checkpoint_every is not None:
+        steps = min(args.checkpoint_every, args.steps)
+    steps_done = 0
     finished = False
     while not finished:
-        pbar = tqdm(total=len(ensemble), desc="Completed 0 simulations")
-
-        for i, replica in enumerate(ensemble):
-
-            replica.evolve(steps, track_order_parameter=True)
-
-            pbar.set_description(f"Completed {i + 1} simulations")
-            pbar.update()
-
-        pbar.close()
+        evolve_ensemble(ensemble, steps, track_order_parameter=True)
+        steps_done += steps
 
         fig, ax = plt.subplots()
         ax.set_xlabel("Steps")
         ax.set_ylabel("Order Parameter")
-        for replica in ensemble:
-            ax.plot(replica.trajectory.keys(), replica.trajectory.values())
+        # The replicas are evolved together, so their trajectories share the same
+        # steps and can be drawn as a single collection of lines
+        steps_so_far, _ = ensemble[0].trajectory_arrays
+        order_parameters = np.stack(
+            [replica.trajectory_arrays[1] for replica in ensemble]
+        )
+        lines = LineCollection(
+            np.stack(np.broadcast_arrays(steps_so_far, order_parameters), axis=-1),
+            # Style sheets need not cycle through colours, in which case use the default
+            colors=plt.rcParams["axes.prop_cycle"].by_key().get("color"),
+        )
+        ax.add_collection(lines)
+        ax.autoscale()
+
+        if not args.interactive:
+            if steps_done >= args.steps:
+                break
+            fig.savefig(outpath / f"ensemble_{steps_done}.png")
+            plt.close(fig)
+            steps = min(args.checkpoint_every, args.steps - steps_done)
+            continue
 
         plt.show()
 
@@ -1,24 +1,131 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import logging
+import os
 from pathlib import Path
 
+import matplotlib
+from matplotlib.animation import FFMpegWriter
 import matplotlib.pyplot as plt
 from tqdm.autonotebook import tqdm
 
-from vicsek.config import parser
+from vicsek.config import get_parser
 from vicsek.model import VicsekModel
+from vicsek.visualize import Snapshot, SnapshotRenderer
 
-parser.add("--frames", type=int, default=100, help="number of snapshots to save")
-parser.add("--steps", type=int, default=1, help="number of steps between snapshots")
+log = logging.getLogger(__name__)
+
+FNAME = "snapshots.mp4"
+
+# Each worker draws all of its snapshots on the same figure
+_renderer = None
+
+
+def _init_worker(style):
+    """Prepares a worker process to render snapshots without a display."""
+    matplotlib.use("Agg")
+    if style is not None:
+        plt.style.use(style)
+
+
+def _save_snapshot(snapshot, path, dpi):
+    """Saves a snapshot of the model as an image at ``path``."""
+    global _renderer
+    if _renderer is None:
+        _renderer = SnapshotRenderer(snapshot)
+    else:
+        _renderer.model = snapshot
+    _renderer.render(path, dpi=dpi or "figure")
+
+
+def _save_images(model, frames, steps, outpath, style, dpi):
+    """Evolves the model, saving a snapshot as an image in ``outpath`` after every
+    ``steps`` steps."""
+    n = len(str(steps * frames))
+
+    # Render and save the snapshots in other processes while the model evolves.
+    # Each one is sent only what it needs to draw, copied since the arguments are
+    # only sent to the worker some time after being submitted
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(style,)
+    ) as executor:
+        # Save initial config
+        pending = {
+            executor.submit(
+                _save_snapshot,
+                Snapshot.from_model(model),
+                outpath / f"snap_{str(0).zfill(n)}.png",
+                dpi,
+            )
+        }
+
+        pbar = tqdm(range(frames))
+        for i in pbar:
+            model.evolve(steps=steps)
+            pending.add(
+                executor.submit(
+                    _save_snapshot,
+                    Snapshot.from_model(model),
+                    outpath / f"snap_{str(model.current_step).zfill(n)}.png",
+                    dpi,
+                )
+            )
+
+            # Don't let the snapshots pile up if rendering can't keep up
+            if len(pending) > 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+
+        pbar.close()
+
+        for future in pending:
+            future.result()
+
+
+def _save_video(model, frames, steps, path, fps, dpi):
+    """Evolves the model, piping a snapshot to ffmpeg after every ``steps`` steps,
+    and saves the resulting video at ``path``."""
+    renderer = SnapshotRenderer(model)
+    writer = FFMpegWriter(fps=fps)
+    with writer.saving(renderer.fig, path, dpi=dpi or renderer.fig.dpi):
+        # Initial config
+        renderer.update()
+        writer.grab_frame()
+
+        for _ in tqdm(range(frames)):
+            model.evolve(steps=steps)
+            renderer.update()
+            writer.grab_frame()
+
+    renderer.close()
 
 
 def main():
-    args = parser.parse_args()
+    args = get_parser("vic-snap").parse_args()
+
+    # Nothing is shown on screen, so there is no need for an interactive backend
+    matplotlib.use("Agg")
+
+    if args.mp4:
+        if not FFMpegWriter.isAvailable():
+            raise RuntimeError("Saving a video with --mp4 requires ffmpeg")
+        outpath = Path(args.outpath)
+        if (outpath / FNAME).is_file():
+            log.warning(
+                f"Existing video found at '{outpath.resolve()}/{FNAME}'. This will be overwritten."
+            )
+        outpath.mkdir(parents=True, exist_ok=True)
+    else:
+        outpath = Path(args.outpath) / "snapshots"
 
-    outpath = Path(args.outpath) / "snapshots"
+        # Really don't want to mix output with snaps from a previous simulation...
+        assert not outpath.is_dir(), f"Existing directory at {outpath.resolve()}."
 
-    # Really don't want to mix output with snaps from a previous simulation...
-    assert not outpath.is_dir(), f"Existing directory at {outpath.resolve()}."
+        outpath.mkdir(parents=True)
 
-    outpath.mkdir(parents=True)
+    if args.style is not None:
+        plt.style.use(args.style)
 
     model = VicsekModel(
         length=args.length,
@@ -29,21 +136,11 @@ def main():
         weights=args.weights,
         seed=args.seed,
     )
-    n = len(str(args.steps * args.frames))
-
-    # Save initial config
-    fig = model.view()
-    fig.savefig(outpath / f"snap_{str(0).zfill(n)}.png")
-    plt.close(fig)
-
-    pbar = tqdm(range(args.frames))
-    for i in pbar:
-        model.evolve(steps=args.steps)
-        fig = model.view()
-        fig.savefig(outpath / f"snap_{str(model.current_step).zfill(n)}.png")
-        plt.close(fig)
 
-    pbar.close()
+    if args.mp4:
+        _save_video(model, args.frames, args.steps, outpath / FNAME, args.fps, args.dpi)
+    else:
+        _save_images(model, args.frames, args.steps, outpath, args.style, args.dpi)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+import pytest
+
+from vicsek.config import get_parser
+
+pytest.importorskip("configargparse")
+
+MODEL_ARGS = ["--length", "10", "--density", "1", "--speed", "0.5", "--noise", "1"]
+
+
+def test_parser_is_cached():
+    assert get_parser("vic-ens") is get_parser("vic-ens")
+    assert get_parser("vic-ens") is not get_parser("vic-snap")
+
+
+def test_unknown_command():
+    with pytest.raises(ValueError):
+        get_parser("vic-evol")
+
+
+@pytest.mark.parametrize(
+    "command, own_args, other_args",
+    [
+        ("vic-ani", ["--frames", "10", "--interval", "50"], ["--mp4"]),
+        ("vic-snap", ["--mp4", "--fps", "24", "--dpi", "72"], ["--interactive"]),
+        ("vic-ens", ["--steps", "20", "--checkpoint-every", "5"], ["--dpi", "72"]),
+    ],
+)
+def test_script_options(command, own_args, other_args):
+    parser = get_parser(command)
+    args = parser.parse_args(MODEL_ARGS + own_args)
+    assert args.length == 10
+    assert args.speed == [0.5]
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(MODEL_ARGS + other_args)
+
+
+@pytest.mark.parametrize("value", ["0", "-5", "x"])
+def test_checkpoint_every_must_be_positive(value):
+    with pytest.raises(SystemExit):
+        get_parser("vic-ens").parse_args(MODEL_ARGS + ["--checkpoint-every", value])
@@ -1,7 +1,7 @@
 import numpy as np
 import pytest
 
-from vicsek.model import VicsekModel
+from vicsek.model import VicsekModel, evolve_ensemble
 
 
 def _test_correct_n_particles(model):
@@ -97,3 +97,204 @@ def test_reproducibility():
     model1.evolve(steps=100)
     model2.evolve(steps=100)
     _test_same_state(model1, model2)
+
+
+def _use_neighbour_search(monkeypatch, search):
+    if search == "numba":
+        pytest.importorskip("numba")
+        monkeypatch.setattr("vicsek._kernels.NUMBA_AVAILABLE", True)
+    else:
+        monkeypatch.setattr("vicsek._kernels.NUMBA_AVAILABLE", False)
+        monkeypatch.setattr(
+            "vicsek.model.DENSE_MAX_PARTICLES", 0 if search == "tree" else 10 ** 6
+        )
+        # Make sure the adjacency matrix is split into several blocks
+        monkeypatch.setattr("vicsek.model.DENSE_BLOCK_ELEMENTS", 1000)
+
+
+@pytest.mark.parametrize("search", ["numba", "tree"])
+@pytest.mark.parametrize("radius", [[2, 1.5, 1], [4, 1], 1.5])
+def test_neighbour_searches_match(monkeypatch, search, radius):
+    model1 = VicsekModel(10, 1, speed=0.5, noise=1, radius=radius, seed=12345)
+    model2 = VicsekModel(10, 1, speed=0.5, noise=1, radius=radius, seed=12345)
+
+    _use_neighbour_search(monkeypatch, "dense")
+    model1.evolve(steps=5, track_order_parameter=True)
+    _use_neighbour_search(monkeypatch, search)
+    model2.evolve(steps=5, track_order_parameter=True)
+
+    np.testing.assert_allclose(model1.positions, model2.positions)
+    # Headings may differ by multiples of 2pi
+    np.testing.assert_allclose(model1.velocities, model2.velocities)
+    assert model1.trajectory.keys() == model2.trajectory.keys()
+    np.testing.assert_allclose(
+        list(model1.trajectory.values()), list(model2.trajectory.values())
+    )
+
+
+def test_reused_neighbour_pairs(monkeypatch):
+    # Slow enough that the k-d tree search reuses its list of pairs for several steps
+    model1 = VicsekModel(10, 1, speed=0.03, noise=1, radius=[2, 1], seed=12345)
+    model2 = VicsekModel(10, 1, speed=0.03, noise=1, radius=[2, 1], seed=12345)
+
+    _use_neighbour_search(monkeypatch, "dense")
+    model1.evolve(steps=50)
+    _use_neighbour_search(monkeypatch, "tree")
+    model2.evolve(steps=50)
+
+    np.testing.assert_allclose(model1.positions, model2.positions)
+    np.testing.assert_allclose(model1.velocities, model2.velocities)
+
+
+@pytest.mark.parametrize("change", ["radius", "positions"])
+def test_rebuilt_neighbour_pairs(monkeypatch, change):
+    model1 = VicsekModel(10, 1, speed=0.03, noise=1, radius=[2, 1], seed=12345)
+    model2 = VicsekModel(10, 1, speed=0.03, noise=1, radius=[2, 1], seed=12345)
+
+    _use_neighbour_search(monkeypatch, "dense")
+    model1.evolve(steps=10)
+    _use_neighbour_search(monkeypatch, "tree")
+    model2.evolve(steps=10)
+
+    # Changes made by hand between steps must invalidate the list of pairs
+    for model in (model1, model2):
+        if change == "radius":
+            model.radius = [3, 1.5]
+        else:
+            model.positions[:10] = (model.positions[:10] + 2.5) % model.length
+
+    _use_neighbour_search(monkeypatch, "dense")
+    model1.evolve(steps=10)
+    _use_neighbour_search(monkeypatch, "tree")
+    model2.evolve(steps=10)
+
+    np.testing.assert_allclose(model1.positions, model2.positions)
+    np.testing.assert_allclose(model1.velocities, model2.velocities)
+
+
+@pytest.mark.parametrize("search", ["numba", "tree", "dense"])
+def test_periodic_neighbours(monkeypatch, search):
+    _use_neighbour_search(monkeypatch, search)
+
+    model = VicsekModel(10, 0.16, speed=0.1, noise=0)
+
+    # Two particles either side of the boundary, and the rest far away from them
+    model.positions[:] = [2.5, 5]
+    model.positions[:2] = [[5, 0.1], [5, 9.9]]
+    model.headings[:] = 0
+    model.headings[:2] = [0, np.pi / 2]
+
+    model.step()
+    np.testing.assert_allclose(model.headings[:2], np.pi / 4)
+
+
+@pytest.mark.parametrize("search", ["numba", "tree", "dense"])
+@pytest.mark.parametrize("radius", [[2, 1.5, 1], 1.5])
+def test_single_precision(monkeypatch, search, radius):
+    _use_neighbour_search(monkeypatch, search)
+
+    # The noise is drawn differently in single precision, so turn it off
+    model1 = VicsekModel(10, 1, speed=0.5, noise=0, radius=radius, seed=12345)
+    model2 = VicsekModel(
+        10, 1, speed=0.5, noise=0, radius=radius, seed=12345, dtype=np.float32
+    )
+
+    model1.evolve(steps=5)
+    model2.evolve(steps=5)
+    assert model2.positions.dtype == model2.headings.dtype == np.float32
+    assert np.all((model2.positions >= 0) & (model2.positions < model2.length))
+    np.testing.assert_allclose(model1.positions, model2.positions, atol=1e-4)
+    np.testing.assert_allclose(
+        model1.order_parameter, model2.order_parameter, atol=1e-4
+    )
+
+
+@pytest.mark.parametrize("search", ["numba", "tree", "dense"])
+def test_negative_speed(monkeypatch, search):
+    _use_neighbour_search(monkeypatch, search)
+
+    # Moving further than one length in a step needs more than a single wrap
+    model = VicsekModel(10, 1, speed=[-25, 0.5], noise=1, seed=12345)
+    model.evolve(steps=5)
+    assert np.all((model.positions >= 0) & (model.positions < model.length))
+
+    ensemble = [
+        VicsekModel(10, 1, speed=[-25, 0.5], noise=1, seed=seed) for seed in range(2)
+    ]
+    evolve_ensemble(ensemble, steps=5)
+    for replica in ensemble:
+        assert np.all((replica.positions >= 0) & (replica.positions < replica.length))
+
+
+def test_single_precision_initial_positions(monkeypatch):
+    _use_neighbour_search(monkeypatch, "tree")
+
+    # With this seed, one coordinate rounds up to the length when cast to float32,
+    # which the periodic k-d tree rejects
+    model = VicsekModel(100, 1, speed=0.5, noise=1, seed=479, dtype=np.float32)
+    assert np.all((model.positions >= 0) & (model.positions < model.length))
+    model.step()
+
+
+@pytest.mark.parametrize("search", ["numba", "dense"])
+def test_evolve_ensemble(monkeypatch, search):
+    _use_neighbour_search(monkeypatch, search)
+
+    ensemble = [
+        VicsekModel(10, 1, speed=0.5, noise=1, radius=[2, 1], seed=seed)
+        for seed in range(3)
+    ]
+    replicas = [
+        VicsekModel(10, 1, speed=0.5, noise=1, radius=[2, 1], seed=seed)
+        for seed in range(3)
+    ]
+
+    evolve_ensemble(ensemble, steps=5, track_order_parameter=True)
+    for model1, model2 in zip(ensemble, replicas):
+        model2.evolve(steps=5, track_order_parameter=True)
+
+        assert model1.current_step == model2.current_step
+        np.testing.assert_allclose(model1.positions, model2.positions)
+        np.testing.assert_allclose(model1.headings, model2.headings)
+        np.testing.assert_allclose(
+            list(model1.trajectory.values()), list(model2.trajectory.values())
+        )
+
+
+def test_evolve_ensemble_large_replicas(monkeypatch):
+    _use_neighbour_search(monkeypatch, "dense")
+    monkeypatch.setattr("vicsek.model.DENSE_MAX_PARTICLES", 50)
+
+    def fail(*args):
+        raise AssertionError("large replicas should not be batched")
+
+    monkeypatch.setattr("vicsek.model._evolve_ensemble_numpy", fail)
+
+    # Too few cells for the tree, so these use the (row-blocked) dense search
+    ensemble = [
+        VicsekModel(10, 1, speed=0.5, noise=1, radius=4, seed=seed) for seed in range(2)
+    ]
+    evolve_ensemble(ensemble, steps=2)
+    assert all(replica.current_step == 2 for replica in ensemble)
+
+
+def test_order_parameter():
+    model = VicsekModel(10, 1, speed=[2, 1], noise=1, seed=12345)
+    np.testing.assert_allclose(
+        model.order_parameter,
+        np.linalg.norm(model.velocities.mean(axis=0)) / model.speed.mean(),
+    )
+
+    model.headings[:] = 1
+    np.testing.assert_allclose(model.order_parameter, 1)
+
+
+def test_trajectory_arrays():
+    model = VicsekModel(10, 1, speed=0.5, noise=1, seed=12345)
+    model.evolve(steps=3, track_order_parameter=True)
+    model.step()
+    model.evolve(steps=2, track_order_parameter=True)
+
+    steps, values = model.trajectory_arrays
+    np.testing.assert_array_equal(steps, [0, 1, 2, 3, 5, 6])
+    assert dict(zip(steps, values)) == model.trajectory
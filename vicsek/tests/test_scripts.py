@@ -0,0 +1,54 @@
+import sys
+
+import matplotlib
+import pytest
+
+from vicsek.scripts import vic_ens
+
+pytest.importorskip("configargparse")
+
+ENSEMBLE_ARGS = [
+    *("--length", "5", "--density", "1", "--speed", "0.3", "--noise", "1"),
+    *("--ensemble-size", "2"),
+]
+
+
+def test_ensemble_checkpoints(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "vic-ens",
+            *("--outpath", str(tmp_path)),
+            *ENSEMBLE_ARGS,
+            *("--steps", "25", "--checkpoint-every", "10"),
+        ],
+    )
+    vic_ens.main()
+
+    # The last, shorter chunk is saved as the final plot rather than a checkpoint
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "ensemble.png",
+        "ensemble_10.png",
+        "ensemble_20.png",
+    ]
+
+
+def test_ensemble_style_without_colours(monkeypatch, tmp_path):
+    style = tmp_path / "linestyles.mplstyle"
+    style.write_text("axes.prop_cycle: cycler('linestyle', ['-', '--'])\n")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "vic-ens",
+            *("--outpath", str(tmp_path)),
+            *ENSEMBLE_ARGS,
+            *("--steps", "5", "--style", str(style)),
+        ],
+    )
+    # Don't let the style leak into other tests
+    with matplotlib.rc_context():
+        vic_ens.main()
+
+    assert (tmp_path / "ensemble.png").is_file()
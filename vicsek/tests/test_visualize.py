@@ -1,5 +1,12 @@
+import numpy as np
+
 from vicsek.model import VicsekModel
-from vicsek.visualize import ParticlesAnimation
+from vicsek.visualize import (
+    ParticlesAnimation,
+    ParticlesAnimationWithAnnealing,
+    Snapshot,
+    SnapshotRenderer,
+)
 
 
 def test_animation_runs():
@@ -7,3 +14,52 @@ def test_animation_runs():
     animator = ParticlesAnimation(model)
 
     _ = animator.animate(frames=10)
+
+
+def test_saved_animation_steps(tmp_path):
+    model = VicsekModel(10, 1, speed=1, noise=1)
+    animator = ParticlesAnimation(model)
+
+    animation = animator.animate(frames=5, steps=2)
+    animation.save(tmp_path / "animation.gif", writer="pillow")
+    assert model.current_step == 10
+
+
+def test_annealing_animation_steps(tmp_path):
+    model = VicsekModel(10, 1, speed=1, noise=1)
+    animator = ParticlesAnimationWithAnnealing(model, anneal_period=4)
+
+    animation = animator.animate(frames=5, steps=2)
+    animation.save(tmp_path / "animation.gif", writer="pillow")
+    assert model.current_step == 10
+
+
+def test_snapshot_renderer(tmp_path):
+    model = VicsekModel(10, 1, speed=1, noise=1)
+    renderer = SnapshotRenderer(model)
+
+    renderer.render(tmp_path / "snap_0.png")
+    model.evolve(steps=2)
+    renderer.render(tmp_path / "snap_2.png")
+    renderer.close()
+    assert (tmp_path / "snap_0.png").is_file()
+    assert (tmp_path / "snap_2.png").is_file()
+
+
+def test_snapshot_matches_model(tmp_path):
+    model = VicsekModel(10, 1, speed=1, noise=1, seed=12345)
+    model.evolve(steps=2)
+
+    snapshot = Snapshot.from_model(model)
+    for name, state in [("model.png", model), ("snapshot.png", snapshot)]:
+        renderer = SnapshotRenderer(state)
+        renderer.render(tmp_path / name)
+        renderer.close()
+
+    # Evolving the model must not change a snapshot that was already taken
+    model.evolve(steps=2)
+    assert snapshot.current_step == 2
+    assert not np.array_equal(snapshot.positions, model.positions)
+    assert (tmp_path / "model.png").read_bytes() == (
+        tmp_path / "snapshot.png"
+    ).read_bytes()
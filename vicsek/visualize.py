@@ -1,5 +1,8 @@
+from typing import NamedTuple
+
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
+from matplotlib.patches import Rectangle
 import numpy as np
 
 
@@ -16,12 +19,13 @@ def get_pixel_density(model) -> float:
         >>> animation = ParticlesAnimation(model, sizes=sizes)
 
     """
-    fig, ax = plt.subplots()
-    return (
-        fig.gca().get_window_extent().transformed(fig.dpi_scale_trans.inverted()).width
-        * fig.dpi
-        / model.length
+    # Width of the axes of a new figure, as set by the rcParams. Working this out
+    # directly avoids creating (and leaving open) a figure just to measure it
+    width_inches, _ = plt.rcParams["figure.figsize"]
+    fraction = (
+        plt.rcParams["figure.subplot.right"] - plt.rcParams["figure.subplot.left"]
     )
+    return width_inches * fraction * plt.rcParams["figure.dpi"] / model.length
 
 
 class ParticlesAnimation:
@@ -61,8 +65,21 @@ class ParticlesAnimation:
         ax.set_axis_off()
         ax.set_aspect("equal")
 
-        # Add a box
-        box = self.model.get_box()
+        # Fix the limits so the animated artists never trigger autoscaling, which
+        # would invalidate the background saved for blitting
+        pad = 0.05 * self.model.length
+        ax.set_xlim(-pad, self.model.length + pad)
+        ax.set_ylim(-pad, self.model.length + pad)
+
+        # Add a box, as in VicsekModel.get_box
+        box = Rectangle(
+            xy=(0, 0),
+            width=self.model.length,
+            height=self.model.length,
+            edgecolor="black",
+            facecolor="none",
+            linewidth=2,
+        )
         ax.add_patch(box)
 
         return fig
@@ -126,7 +143,20 @@ class ParticlesAnimation:
         def _loop(i):
             return self.loop(i, steps, artists)
 
-        ani = FuncAnimation(fig, _loop, frames=frames, interval=interval, blit=True)
+        # Hand the initial artists back as they are, rather than letting
+        # FuncAnimation draw the first frame (and hence step the model) every
+        # time it needs a fresh background, e.g. on resizing or saving
+        def _init():
+            return artists
+
+        ani = FuncAnimation(
+            fig,
+            _loop,
+            frames=frames,
+            init_func=_init,
+            interval=interval,
+            blit=True,
+        )
 
         return ani
 
@@ -187,11 +217,107 @@ class ParticlesAnimationWithAnnealing(ParticlesAnimation):
         """Extends super().loop() to also vary the noise during the animation, and
         add annotations for the noise and the order parameter."""
         particles, op_label, noise_label = artists
-        super().loop(i, steps, particles)
+        super().loop(i, steps, (particles,))
 
         current_noise = np.pi * (1 + np.cos(2 * np.pi * i / self.anneal_period))
-        self.model.noise = np.full(self.model.particles, fill_value=current_noise)
+        # Every particle has the same noise, so overwrite the existing array in place
+        # rather than allocating a new one for each frame
+        self.model.noise.fill(current_noise)
 
         op_label.set_text(f"OP = {self.model.order_parameter:1.2f}")
         noise_label.set_text(rf"$\eta$ = {current_noise:1.1f}")
         return artists
+
+
+class Snapshot(NamedTuple):
+    """The parts of the state of a model that are needed to draw it.
+
+    This is much cheaper to copy, or to send to another process, than the model
+    itself, which also carries its random number generator and scratch arrays.
+    """
+
+    length: int
+    positions: np.ndarray
+    velocities: np.ndarray
+    order_parameter: float
+    current_step: int
+
+    @classmethod
+    def from_model(cls, model):
+        """Takes a snapshot of the current state of ``model``."""
+        return cls(
+            model.length,
+            model.positions.copy(),
+            model.velocities,
+            model.order_parameter,
+            model.current_step,
+        )
+
+
+class SnapshotRenderer:
+    """Class which saves snapshots of a model, drawn as in ``VicsekModel.view``.
+
+    Rather than building a new figure for every snapshot, the figure is created
+    once and only the arrows and annotations are updated before each save.
+
+    Parameters
+    ----------
+    model : VicsekModel or Snapshot
+        The model, or snapshot of a model, to draw. May be replaced by assigning to
+        ``model``, provided the new one has the same number of particles and size of
+        box.
+    annotate : bool, optional
+        If True, annotate the snapshots with the current value of the order
+        parameter and the number of steps since the model was initialised.
+        True by default.
+    """
+
+    def __init__(self, model, *, annotate: bool = True):
+        self.model = model
+        self.annotate = annotate
+
+        self.fig, ax = plt.subplots()
+
+        # Hide axes and make figure square (L, L)
+        ax.set_axis_off()
+        ax.set_aspect("equal")
+
+        # Add a box, as in VicsekModel.get_box
+        box = Rectangle(
+            xy=(0, 0),
+            width=self.model.length,
+            height=self.model.length,
+            edgecolor="black",
+            facecolor="none",
+            linewidth=2,
+        )
+        ax.add_patch(box)
+
+        x, y = self.model.positions.T
+        u, v = self.model.velocities.T
+        self.arrows = ax.quiver(x, y, u, v)
+        if annotate:
+            self.op_label = ax.annotate(
+                "", xy=(0.9, -0.1), xycoords="axes fraction", fontsize=12
+            )
+            self.step_label = ax.annotate(
+                "", xy=(0, -0.1), xycoords="axes fraction", fontsize=12
+            )
+
+    def update(self):
+        """Updates the arrows and annotations to the current state of the model."""
+        self.arrows.set_offsets(self.model.positions)
+        self.arrows.set_UVC(*self.model.velocities.T)
+        if self.annotate:
+            self.op_label.set_text(f"OP = {self.model.order_parameter:1.2f}")
+            self.step_label.set_text(f"t = {self.model.current_step}")
+
+    def render(self, path, **kwargs):
+        """Draws the current state of the model and saves it to ``path``. Keyword
+        arguments are passed on to ``matplotlib.figure.Figure.savefig``."""
+        self.update()
+        self.fig.savefig(path, **kwargs)
+
+    def close(self):
+        """Closes the figure."""
+        plt.close(self.fig)